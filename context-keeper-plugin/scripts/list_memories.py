@@ -1,15 +1,40 @@
 #!/usr/bin/env python3
 """
-List Context Script: List all saved contexts, optionally filtered by session ID.
+List Context Script: List all saved contexts from index.jsonl, optionally filtered by session ID.
 
-Uses jq subprocess for efficient extraction, falls back to full JSON parsing.
+Parses the index in-process (newest entries are last in the file).
 """
 
+import os
 import sys
 import json
-import subprocess
+from datetime import datetime
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+INDEX_FILENAME = "index.jsonl"
+# Older releases kept the index as one JSON document, newest entry first
+LEGACY_INDEX_FILENAME = "index.json"
+
+
+def json_loads(data: bytes | str):
+    """Decode JSON, using orjson when available (accepts bytes without decoding)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Encode obj as UTF-8 JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
 
 def get_memories_dir() -> Path:
     """Get the memories directory for the current project."""
@@ -17,46 +42,45 @@ def get_memories_dir() -> Path:
     return cwd / ".claude" / "memories"
 
 
-def load_index_with_jq(index_path: Path, session_filter: str = None) -> list:
-    """Load memories using jq for efficiency."""
+def migrate_legacy_index(index_path: Path):
+    """Convert a legacy index.json (newest first) into index.jsonl (oldest first), once."""
+    if index_path.exists():
+        return
     try:
-        if session_filter:
-            # Filter by session_id prefix
-            jq_query = f'.memories | map(select(.session_id | startswith("{session_filter}"))) | map({{session_id, timestamp, created_at, trigger, message_count, memory_path}})'
-        else:
-            jq_query = '.memories | map({session_id, timestamp, created_at, trigger, message_count, memory_path})'
-
-        result = subprocess.run(
-            ['jq', '-c', jq_query],
-            stdin=open(index_path, 'r'),
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        if result.returncode == 0 and result.stdout.strip():
-            return json.loads(result.stdout)
-    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError, json.JSONDecodeError):
-        pass
-    return None
+        legacy = json_loads(index_path.with_name(LEGACY_INDEX_FILENAME).read_bytes())
+        entries = [entry for entry in reversed(legacy.get("memories", [])) if isinstance(entry, dict)]
+    except (OSError, json.JSONDecodeError, AttributeError, TypeError):
+        return
+    tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}")
+    try:
+        tmp_path.write_bytes(b''.join(json_dumps(entry) + b'\n' for entry in entries))
+        os.replace(tmp_path, index_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
 
 
-def load_index_fallback(index_path: Path, session_filter: str = None) -> list:
-    """Fallback: load full index.json and filter."""
+def load_index(index_path: Path, session_filter: str = None) -> list:
+    """Parse index.jsonl (newest first) and filter."""
     try:
-        index = json.loads(index_path.read_text(encoding='utf-8'))
-        memories = index.get("memories", [])
+        memories = []
+        for line in reversed(index_path.read_bytes().splitlines()):
+            if not line.strip():
+                continue
+            try:
+                memories.append(json_loads(line))
+            except json.JSONDecodeError:
+                continue
         if session_filter:
             memories = [s for s in memories if s.get("session_id", "").startswith(session_filter)]
         return memories
-    except (json.JSONDecodeError, FileNotFoundError):
+    except FileNotFoundError:
         return []
 
 
 def format_timestamp(created_at: str) -> str:
     """Format ISO timestamp to readable format."""
     try:
-        from datetime import datetime
-        dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        dt = datetime.fromisoformat(created_at)
         return dt.strftime("%Y-%m-%d %H:%M")
     except (ValueError, TypeError):
         return created_at[:16] if created_at else "unknown"
@@ -68,13 +92,16 @@ def list_all_contexts(memories: list):
     print("| # | Session ID | Timestamp | Trigger | Messages |")
     print("|---|------------|-----------|---------|----------|")
 
+    # Build the rows and write the table once
+    rows = []
     for i, s in enumerate(memories, 1):
         sid = s.get("session_id", "unknown")
         short_sid = f"{sid[:8]}..." if len(sid) > 8 else sid
         ts = format_timestamp(s.get("created_at", ""))
         trigger = s.get("trigger", "-")
         msgs = s.get("message_count", 0)
-        print(f"| {i} | {short_sid} | {ts} | {trigger} | {msgs} |")
+        rows.append(f"| {i} | {short_sid} | {ts} | {trigger} | {msgs} |")
+    print("\n".join(rows))
 
     session_ids = set(s.get("session_id") for s in memories)
     print(f"\nTotal: {len(memories)} context memories across {len(session_ids)} sessions")
@@ -91,20 +118,25 @@ def list_session_contexts(memories: list, session_filter: str):
     full_sid = memories[0].get("session_id", session_filter)
     print(f"## Context History for Session {full_sid[:16]}...\n")
 
+    # Build all entries and write them once
+    blocks = []
     for i, s in enumerate(memories, 1):
         ts = format_timestamp(s.get("created_at", ""))
-        print(f"### Compaction {i}: {ts}")
-        print(f"- **Trigger:** {s.get('trigger', '-')}")
-        print(f"- **Messages:** {s.get('message_count', 0)}")
-        print(f"- **Summary Path:** {s.get('memory_path', '-')}")
-        print()
+        blocks.append(
+            f"### Compaction {i}: {ts}\n"
+            f"- **Trigger:** {s.get('trigger', '-')}\n"
+            f"- **Messages:** {s.get('message_count', 0)}\n"
+            f"- **Summary Path:** {s.get('memory_path', '-')}\n"
+        )
+    print("\n".join(blocks))
 
     print("Would you like me to load one of these contexts?")
 
 
 def main():
     memories_dir = get_memories_dir()
-    index_path = memories_dir / "index.json"
+    index_path = memories_dir / INDEX_FILENAME
+    migrate_legacy_index(index_path)
 
     if not index_path.exists():
         print("No context memories found. Run `/compact` to create your first memory.")
@@ -113,10 +145,7 @@ def main():
     # Get optional session filter from args
     session_filter = sys.argv[1] if len(sys.argv) > 1 else None
 
-    # Try jq first, then fallback
-    memories = load_index_with_jq(index_path, session_filter)
-    if memories is None:
-        memories = load_index_fallback(index_path, session_filter)
+    memories = load_index(index_path, session_filter)
 
     if not memories:
         if session_filter:
@@ -1,15 +1,39 @@
 #!/usr/bin/env python3
 """
-List Sessions Script: Efficiently list all stored sessions from index.json.
+List Sessions Script: Efficiently list all stored sessions from index.jsonl.
 
-Uses jq subprocess for efficient extraction, falls back to full JSON parsing.
+Parses the index in-process (newest entries are last in the file).
 """
 
+import os
 import sys
 import json
-import subprocess
+from datetime import datetime
 from pathlib import Path
-from collections import defaultdict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+INDEX_FILENAME = "index.jsonl"
+# Older releases kept the index as one JSON document, newest entry first
+LEGACY_INDEX_FILENAME = "index.json"
+
+
+def json_loads(data: bytes | str):
+    """Decode JSON, using orjson when available (accepts bytes without decoding)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Encode obj as UTF-8 JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
 
 
 def get_memories_dir() -> Path:
@@ -18,31 +42,36 @@ def get_memories_dir() -> Path:
     return cwd / ".claude" / "memories"
 
 
-def load_index_with_jq(index_path: Path) -> list:
-    """Load memories using jq for efficiency."""
+def migrate_legacy_index(index_path: Path):
+    """Convert a legacy index.json (newest first) into index.jsonl (oldest first), once."""
+    if index_path.exists():
+        return
     try:
-        # Extract only needed fields: session_id, timestamp, created_at, trigger, project, message_count
-        jq_query = '.memories | map({session_id, timestamp, created_at, trigger, project, message_count})'
-        result = subprocess.run(
-            ['jq', '-c', jq_query],
-            stdin=open(index_path, 'r'),
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        if result.returncode == 0 and result.stdout.strip():
-            return json.loads(result.stdout)
-    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError, json.JSONDecodeError):
-        pass
-    return None
-
-
-def load_index_fallback(index_path: Path) -> list:
-    """Fallback: load full index.json."""
+        legacy = json_loads(index_path.with_name(LEGACY_INDEX_FILENAME).read_bytes())
+        entries = [entry for entry in reversed(legacy.get("memories", [])) if isinstance(entry, dict)]
+    except (OSError, json.JSONDecodeError, AttributeError, TypeError):
+        return
+    tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}")
     try:
-        index = json.loads(index_path.read_text(encoding='utf-8'))
-        return index.get("memories", [])
-    except (json.JSONDecodeError, FileNotFoundError):
+        tmp_path.write_bytes(b''.join(json_dumps(entry) + b'\n' for entry in entries))
+        os.replace(tmp_path, index_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_index(index_path: Path) -> list:
+    """Parse index.jsonl (newest first)."""
+    try:
+        memories = []
+        for line in reversed(index_path.read_bytes().splitlines()):
+            if not line.strip():
+                continue
+            try:
+                memories.append(json_loads(line))
+            except json.JSONDecodeError:
+                continue
+        return memories
+    except FileNotFoundError:
         return []
 
 
@@ -50,8 +79,7 @@ def format_timestamp(created_at: str) -> str:
     """Format ISO timestamp to readable format."""
     try:
         # Parse ISO format and format nicely
-        from datetime import datetime
-        dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        dt = datetime.fromisoformat(created_at)
         return dt.strftime("%Y-%m-%d %H:%M")
     except (ValueError, TypeError):
         return created_at[:16] if created_at else "unknown"
@@ -59,57 +87,49 @@ def format_timestamp(created_at: str) -> str:
 
 def main():
     memories_dir = get_memories_dir()
-    index_path = memories_dir / "index.json"
+    index_path = memories_dir / INDEX_FILENAME
+    migrate_legacy_index(index_path)
 
     if not index_path.exists():
         print("No sessions found. Context memories are created automatically when you run `/compact`.")
         return
 
-    # Try jq first, then fallback
-    memories = load_index_with_jq(index_path)
-    if memories is None:
-        memories = load_index_fallback(index_path)
+    memories = load_index(index_path)
 
     if not memories:
         print("No sessions recorded yet. Your first context will be saved on the next compaction.")
         return
 
-    # Group by session_id
-    sessions = defaultdict(lambda: {
-        "compaction_count": 0,
-        "latest_timestamp": None,
-        "latest_created": "",
-        "project": "",
-        "total_messages": 0
-    })
-
+    # Group by session_id: [latest_created, compaction_count, total_messages, project]
+    sessions = {}
     for memory in memories:
         sid = memory.get("session_id", "unknown")
-        sessions[sid]["compaction_count"] += 1
-        sessions[sid]["total_messages"] += memory.get("message_count", 0)
-        sessions[sid]["project"] = memory.get("project", "")
-
         created = memory.get("created_at", "")
-        if not sessions[sid]["latest_created"] or created > sessions[sid]["latest_created"]:
-            sessions[sid]["latest_created"] = created
-            sessions[sid]["latest_timestamp"] = format_timestamp(created)
+        entry = sessions.get(sid)
+        if entry is None:
+            # Index is newest first, so the first entry seen carries the session's project
+            sessions[sid] = [created, 1, memory.get("message_count", 0), memory.get("project", "")]
+        else:
+            entry[1] += 1
+            entry[2] += memory.get("message_count", 0)
+            if created > entry[0]:
+                entry[0] = created
 
     # Sort by latest activity
-    sorted_sessions = sorted(
-        sessions.items(),
-        key=lambda x: x[1]["latest_created"],
-        reverse=True
-    )
+    sorted_sessions = sorted(sessions.items(), key=lambda item: item[1][0], reverse=True)
 
     # Output markdown table
     print("## Stored Sessions\n")
     print("| # | Session ID | Compactions | Latest Activity | Project | Messages |")
     print("|---|------------|-------------|-----------------|---------|----------|")
 
-    for i, (sid, data) in enumerate(sorted_sessions, 1):
+    # Build the rows and write the table once
+    rows = []
+    for i, (sid, (latest_created, compaction_count, total_messages, project_path)) in enumerate(sorted_sessions, 1):
         short_sid = f"{sid[:8]}..." if len(sid) > 8 else sid
-        project = Path(data["project"]).name if data["project"] else "-"
-        print(f"| {i} | {short_sid} | {data['compaction_count']} | {data['latest_timestamp']} | {project} | {data['total_messages']} |")
+        project = Path(project_path).name if project_path else "-"
+        rows.append(f"| {i} | {short_sid} | {compaction_count} | {format_timestamp(latest_created)} | {project} | {total_messages} |")
+    print("\n".join(rows))
 
     print(f"\n**Total:** {len(sessions)} sessions with {len(memories)} context memories")
     print("\n### Quick Actions")
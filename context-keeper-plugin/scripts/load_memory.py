@@ -15,14 +15,43 @@ Output:
 - Manual mode: Displays memory content and asks for user confirmation
 """
 
+import os
 import sys
 import json
-import subprocess
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
+from typing import Iterator, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
+INDEX_FILENAME = "index.jsonl"
+# Older releases kept the index as one JSON document, newest entry first
+LEGACY_INDEX_FILENAME = "index.json"
+
+# The index is read backwards in blocks of this size (newest entries are last)
+INDEX_READ_BLOCK = 64 * 1024
+
+# Memories older than this are not injected automatically
+MAX_MEMORY_AGE_HOURS = 24
+
+
+def json_loads(data: bytes | str):
+    """Decode JSON, using orjson when available (accepts bytes without decoding)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Encode obj as UTF-8 JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
 
 
 def get_memories_dir(project_path: str = None) -> Path:
@@ -33,95 +62,153 @@ def get_memories_dir(project_path: str = None) -> Path:
     return cwd / ".claude" / "memories"
 
 
-def load_latest_memory(project_path: str, session_id: str = None) -> tuple[str, dict]:
+def iter_lines_reversed(path: Path) -> Iterator[bytes]:
+    """Yield the lines of a file last to first, reading it backwards in INDEX_READ_BLOCK chunks."""
+    with open(path, 'rb') as f:
+        pos = f.seek(0, 2)
+        partial = b''
+        while pos > 0:
+            size = min(INDEX_READ_BLOCK, pos)
+            pos -= size
+            f.seek(pos)
+            lines = (f.read(size) + partial).split(b'\n')
+            # The first piece may continue in the previous block
+            partial = lines[0]
+            yield from reversed(lines[1:])
+        yield partial
+
+
+def migrate_legacy_index(index_path: Path):
+    """Convert a legacy index.json (newest first) into index.jsonl (oldest first), once."""
+    if index_path.exists():
+        return
+    try:
+        legacy = json_loads(index_path.with_name(LEGACY_INDEX_FILENAME).read_bytes())
+        entries = [entry for entry in reversed(legacy.get("memories", [])) if isinstance(entry, dict)]
+    except (OSError, json.JSONDecodeError, AttributeError, TypeError):
+        return
+    tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}")
+    try:
+        tmp_path.write_bytes(b''.join(json_dumps(entry) + b'\n' for entry in entries))
+        os.replace(tmp_path, index_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+
+
+def iter_index_entries(index_path: Path) -> Iterator[dict]:
+    """
+    Yield JSONL memories index entries, newest first (malformed lines are skipped).
+
+    The file is read from the end and lines are parsed lazily, so loading the
+    latest entry reads one block no matter how large the index is.
+    """
+    migrate_legacy_index(index_path)
+    for line in iter_lines_reversed(index_path):
+        if not line.strip():
+            continue
+        try:
+            yield json_loads(line)
+        except json.JSONDecodeError:
+            continue
+
+
+def read_memory_file(memory_path: Path) -> Optional[str]:
+    """
+    Read a memory's content, or None if the file cannot be read.
+
+    A single open replaces the exists() probe; legacy .md memories are
+    recognised by their first byte and returned as-is without a failed parse.
+    """
+    try:
+        raw = memory_path.read_bytes()
+    except OSError:
+        return None
+    if raw[:1] == b'{':
+        try:
+            return json_loads(raw).get('content', '')
+        except json.JSONDecodeError:
+            pass
+    # Fallback for old .md files
+    return raw.decode('utf-8', 'replace')
+
+
+def memory_age_hours(metadata: dict) -> Optional[float]:
+    """Age of a memory in hours, or None if it has no parsable timestamp."""
+    created_at = metadata.get('timestamp', metadata.get('created_at', ''))
+    try:
+        memory_time = datetime.fromisoformat(created_at)
+    except (ValueError, TypeError):
+        return None
+    return (datetime.now(memory_time.tzinfo) - memory_time).total_seconds() / 3600
+
+
+def load_latest_memory(project_path: str, session_id: str = None, max_age_hours: float = None) -> tuple[str, dict]:
     """
     Load the most recent memory for context injection.
 
+    If max_age_hours is given, a memory older than that is returned as
+    (None, metadata); for index entries the age is checked before the memory
+    file is read.
+
     Returns:
         tuple: (memory_content, metadata) or (None, None) if not found
     """
     memories_dir = get_memories_dir(project_path)
 
-    if not memories_dir.exists():
-        return None, None
-
-    # Try to load from specific session if provided
+    # Try to load from specific session if provided. Open the files through
+    # the 'latest' symlink directly: a missing link, directory or file all
+    # surface as one failed open instead of a chain of stat calls.
     if session_id:
-        session_dir = memories_dir / session_id
-        if session_dir.exists():
-            latest_link = session_dir / "latest"
-            if latest_link.exists():
-                # Resolve symlink
-                if latest_link.is_symlink():
-                    target = session_dir / latest_link.resolve().name
-                else:
-                    target = latest_link
-
-                memory_path = target / "memory.json" if target.is_dir() else None
-                metadata_path = target / "metadata.json" if target.is_dir() else None
-
-                if memory_path and memory_path.exists():
-                    try:
-                        memory_data = json.loads(memory_path.read_text(encoding='utf-8'))
-                        memory = memory_data.get('content', '')
-                    except json.JSONDecodeError:
-                        # Fallback for old .md files
-                        memory_path_old = target / "memory.md"
-                        if memory_path_old.exists():
-                            memory = memory_path_old.read_text(encoding='utf-8')
-                        else:
-                            memory = ""
+        latest_dir = memories_dir / session_id / "latest"
+        try:
+            memory_bytes = (latest_dir / "memory.json").read_bytes()
+        except OSError:
+            memory_bytes = None
+
+        if memory_bytes is not None:
+            try:
+                memory_data = json_loads(memory_bytes)
+            except json.JSONDecodeError:
+                memory_data = None
+
+            # memory.json embeds the metadata; older memories only have metadata.json
+            metadata = memory_data.get('metadata') if memory_data is not None else None
+            if metadata is None:
+                try:
+                    metadata = json_loads((latest_dir / "metadata.json").read_bytes())
+                except (OSError, json.JSONDecodeError):
                     metadata = {}
-                    if metadata_path and metadata_path.exists():
-                        try:
-                            metadata = json.loads(metadata_path.read_text(encoding='utf-8'))
-                        except json.JSONDecodeError:
-                            pass
-                    return memory, metadata
-
-    # Fallback: Load from index (most recent across all sessions)
-    index_path = memories_dir / "index.json"
-    if not index_path.exists():
-        return None, None
 
-    # Try using jq for efficient extraction (only reads first entry)
-    latest = None
-    try:
-        result = subprocess.run(
-            ['jq', '-r', '.memories[0]'],
-            stdin=open(index_path, 'r'),
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0 and result.stdout.strip() and result.stdout.strip() != 'null':
-            latest = json.loads(result.stdout)
-    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
-        # jq not available or failed, fall back to full JSON parsing
-        pass
+            age_hours = memory_age_hours(metadata)
+            if max_age_hours is not None and age_hours is not None and age_hours > max_age_hours:
+                return None, metadata
+
+            if memory_data is not None:
+                memory = memory_data.get('content', '')
+            else:
+                # Fallback for old .md files
+                try:
+                    memory = (latest_dir / "memory.md").read_text(encoding='utf-8')
+                except OSError:
+                    memory = ""
+            return memory, metadata
 
-    # Fallback: Read full JSON if jq failed
+    # Fallback: Load from index (most recent across all sessions); a missing
+    # index fails the open instead of being probed with exists() first
+    try:
+        latest = next(iter_index_entries(memories_dir / INDEX_FILENAME), None)
+    except FileNotFoundError:
+        return None, None
     if latest is None:
-        try:
-            index = json.loads(index_path.read_text(encoding='utf-8'))
-            memories = index.get("memories", [])
-            if not memories:
-                return None, None
-            latest = memories[0]
-        except (json.JSONDecodeError, KeyError, FileNotFoundError) as e:
-            print(f"[context-keeper] Error: Failed to load from index: {e}", file=sys.stderr)
-            return None, None
+        return None, None
+
+    age_hours = memory_age_hours(latest)
+    if max_age_hours is not None and age_hours is not None and age_hours > max_age_hours:
+        return None, latest
 
     try:
-        memory_path = memories_dir / latest["memory_path"]
-        if memory_path.exists():
-            # Read memory as JSON
-            try:
-                memory_data = json.loads(memory_path.read_text(encoding='utf-8'))
-                memory = memory_data.get('content', '')
-            except json.JSONDecodeError:
-                # Fallback for old .md files
-                memory = memory_path.read_text(encoding='utf-8')
+        memory = read_memory_file(memories_dir / latest["memory_path"])
+        if memory is not None:
             return memory, latest
     except (KeyError, TypeError) as e:
         print(f"[context-keeper] Error: Invalid index entry: {e}", file=sys.stderr)
@@ -132,49 +219,16 @@ def load_latest_memory(project_path: str, session_id: str = None) -> tuple[str,
 def find_memory_by_identifier(identifier: str) -> tuple[str, dict]:
     """Find a memory by session_id or timestamp prefix."""
     memories_dir = get_memories_dir()
-    index_path = memories_dir / "index.json"
-
-    if not index_path.exists():
-        return None, None
-
-    # Try jq first for efficiency
-    try:
-        jq_query = f'.memories | map(select(.session_id | startswith("{identifier}")) // select(.timestamp | startswith("{identifier}"))) | .[0]'
-        result = subprocess.run(
-            ['jq', '-c', jq_query],
-            stdin=open(index_path, 'r'),
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0 and result.stdout.strip() and result.stdout.strip() != 'null':
-            entry = json.loads(result.stdout)
-            memory_path = memories_dir / entry.get("memory_path", "")
-            if memory_path.exists():
-                try:
-                    memory_data = json.loads(memory_path.read_text(encoding='utf-8'))
-                    memory = memory_data.get('content', '')
-                except json.JSONDecodeError:
-                    memory = memory_path.read_text(encoding='utf-8')
-                return memory, entry
-    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError, json.JSONDecodeError):
-        pass
+    index_path = memories_dir / INDEX_FILENAME
 
-    # Fallback: Full JSON parsing
+    # Search newest first
     try:
-        index = json.loads(index_path.read_text(encoding='utf-8'))
-        memories = index.get("memories", [])
-        for entry in memories:
+        for entry in iter_index_entries(index_path):
             if entry.get("session_id", "").startswith(identifier) or entry.get("timestamp", "").startswith(identifier):
-                memory_path = memories_dir / entry.get("memory_path", "")
-                if memory_path.exists():
-                    try:
-                        memory_data = json.loads(memory_path.read_text(encoding='utf-8'))
-                        memory = memory_data.get('content', '')
-                    except json.JSONDecodeError:
-                        memory = memory_path.read_text(encoding='utf-8')
+                memory = read_memory_file(memories_dir / entry.get("memory_path", ""))
+                if memory is not None:
                     return memory, entry
-    except (json.JSONDecodeError, FileNotFoundError):
+    except FileNotFoundError:
         pass
 
     return None, None
@@ -215,7 +269,7 @@ This context was automatically loaded from a previous session memory.
 def format_timestamp(created_at: str) -> str:
     """Format ISO timestamp to readable format."""
     try:
-        dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        dt = datetime.fromisoformat(created_at)
         return dt.strftime("%Y-%m-%d %H:%M:%S")
     except (ValueError, TypeError):
         return created_at[:19] if created_at else "unknown"
@@ -223,14 +277,12 @@ def format_timestamp(created_at: str) -> str:
 
 def automatic_mode():
     """Run in automatic mode (triggered by SessionStart hook)."""
-    # Print visible banner to stderr
-    print("\n" + "=" * 60, file=sys.stderr)
-    print("🔄 [context-keeper] Session Start Hook Running...", file=sys.stderr)
-    print("=" * 60, file=sys.stderr)
+    # Visible banner and progress lines for stderr, written in one call on exit
+    status = ["\n" + "=" * 60, "🔄 [context-keeper] Session Start Hook Running...", "=" * 60]
 
     try:
         # Read input from Claude Code
-        hook_input = json.loads(sys.stdin.read())
+        hook_input = json_loads(sys.stdin.buffer.read())
 
         # Extract session information (all available fields)
         session_id = hook_input.get("session_id", "")
@@ -240,80 +292,68 @@ def automatic_mode():
         source = hook_input.get("source", "unknown")  # startup, resume, clear, compact
         cwd = hook_input.get("cwd", "")
 
-        print(f"📋 [context-keeper] Source: {source}, Permission: {permission_mode}", file=sys.stderr)
+        status.append(f"📋 [context-keeper] Source: {source}, Permission: {permission_mode}")
 
         # Only inject context on resume (after compaction) or compact
         # Skip if this is a clear event (user explicitly cleared)
         if source == "clear":
-            print("ℹ️  [context-keeper] Skipping context injection (clear event)", file=sys.stderr)
-            print("=" * 60 + "\n", file=sys.stderr)
+            status.append("ℹ️  [context-keeper] Skipping context injection (clear event)")
             sys.exit(0)
 
         # Skip on fresh startup - only load context on resume/compact
         if source == "startup":
-            print("ℹ️  [context-keeper] Skipping context injection (fresh startup)", file=sys.stderr)
-            print("=" * 60 + "\n", file=sys.stderr)
+            status.append("ℹ️  [context-keeper] Skipping context injection (fresh startup)")
             sys.exit(0)
 
         if not cwd:
-            print("ℹ️  [context-keeper] Skipping context injection (no cwd)", file=sys.stderr)
-            print("=" * 60 + "\n", file=sys.stderr)
+            status.append("ℹ️  [context-keeper] Skipping context injection (no cwd)")
             sys.exit(0)
 
         # Load latest memory
-        print("📂 [context-keeper] Searching for previous session context...", file=sys.stderr)
-        memory, metadata = load_latest_memory(cwd, session_id)
+        status.append("📂 [context-keeper] Searching for previous session context...")
+        memory, metadata = load_latest_memory(cwd, session_id, max_age_hours=MAX_MEMORY_AGE_HOURS)
 
         if not memory:
+            # Skip memories from a very old session (checked before the memory file is read)
+            age_hours = memory_age_hours(metadata) if metadata else None
+            if age_hours is not None and age_hours > MAX_MEMORY_AGE_HOURS:
+                status.append(f"ℹ️  [context-keeper] Context is {age_hours:.1f}h old, skipping (>{MAX_MEMORY_AGE_HOURS}h)")
+                sys.exit(0)
+
             # No memory available - this is fine, just exit cleanly
-            print("ℹ️  [context-keeper] No previous session context found", file=sys.stderr)
-            print("=" * 60 + "\n", file=sys.stderr)
+            status.append("ℹ️  [context-keeper] No previous session context found")
             sys.exit(0)
 
-        print(f"📄 [context-keeper] Found context for session {session_id[:8] if session_id else 'unknown'}...", file=sys.stderr)
-
-        # Check if this memory is recent enough to be relevant
-        # Skip if the memory is from a very old session (>24 hours)
-        try:
-            created_at = metadata.get('timestamp', metadata.get('created_at', ''))
-            if created_at:
-                # Parse ISO format
-                memory_time = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                now = datetime.now(memory_time.tzinfo) if memory_time.tzinfo else datetime.now()
-                age_hours = (now - memory_time.replace(tzinfo=None)).total_seconds() / 3600
-
-                if age_hours > 24:
-                    # Summary is old, skip injection but don't error
-                    print(f"ℹ️  [context-keeper] Context is {age_hours:.1f}h old, skipping (>24h)", file=sys.stderr)
-                    print("=" * 60 + "\n", file=sys.stderr)
-                    sys.exit(0)
-        except (ValueError, TypeError):
-            # Can't parse date, continue anyway
-            pass
+        status.append(f"📄 [context-keeper] Found context for session {session_id[:8] if session_id else 'unknown'}...")
 
         # Format and output context
-        print("📥 [context-keeper] Loading context into session...", file=sys.stderr)
+        status.append("📥 [context-keeper] Loading context into session...")
         context = format_context(memory, metadata or {}, source, permission_mode)
         print(context)
 
-        # Print visible completion message
-        print("✅ [context-keeper] Previous session context loaded successfully!", file=sys.stderr)
-        print("=" * 60 + "\n", file=sys.stderr)
+        # Visible completion message
+        status.append("✅ [context-keeper] Previous session context loaded successfully!")
 
         sys.exit(0)
 
     except Exception as e:
-        print(f"❌ [context-keeper] Error: {e}", file=sys.stderr)
-        print("=" * 60 + "\n", file=sys.stderr)
+        status.append(f"❌ [context-keeper] Error: {e}")
         sys.exit(1)
 
+    finally:
+        status.append("=" * 60 + "\n")
+        sys.stderr.write("\n".join(status) + "\n")
+        sys.stderr.flush()
+
 
 def manual_mode(identifier=None):
     """Run in manual mode (user-invoked command)."""
     memories_dir = get_memories_dir()
-    index_path = memories_dir / "index.json"
+    index_path = memories_dir / INDEX_FILENAME
+    migrate_legacy_index(index_path)
 
-    if not memories_dir.exists() or not index_path.exists():
+    # The index lives inside the memories directory, so one check covers both
+    if not index_path.exists():
         print("No context memories found. Run `/compact` to create your first memory.")
         return
 
@@ -327,13 +367,11 @@ def manual_mode(identifier=None):
             print(f"No context found for '{identifier}'.")
             print("\nAvailable contexts:")
             try:
-                index = json.loads(index_path.read_text(encoding='utf-8'))
-                memories = index.get("memories", [])
-                for s in memories[:5]:
+                for s in islice(iter_index_entries(index_path), 5):
                     sid = s.get("session_id", "unknown")[:8]
                     ts = format_timestamp(s.get("created_at", ""))
                     print(f"  - [{sid}...] {ts}")
-            except (json.JSONDecodeError, FileNotFoundError):
+            except FileNotFoundError:
                 pass
             return
     else:
@@ -359,7 +397,13 @@ def manual_mode(identifier=None):
 
 
 def main():
-    # Determine mode: if stdin has data, it's automatic mode; otherwise manual
+    # Only the manual command takes an argument, so skip probing stdin
+    if len(sys.argv) > 1:
+        manual_mode(sys.argv[1])
+        return
+
+    # Determine mode: if stdin has data, it's automatic mode; otherwise manual.
+    # isatty() cannot decide this: the slash command runs through a non-TTY shell.
     import select
 
     # Check if stdin has data (automatic mode)
@@ -368,8 +412,7 @@ def main():
         automatic_mode()
     else:
         # No stdin data - manual command mode
-        identifier = sys.argv[1] if len(sys.argv) > 1 else None
-        manual_mode(identifier)
+        manual_mode()
 
 
 if __name__ == "__main__":
@@ -18,18 +18,32 @@ Environment variables:
 """
 
 import argparse
+import functools
+import hashlib
+import importlib.util
 import json
 import logging
 import os
 import re
 import sys
 import traceback
+from collections import deque
 import urllib.request
 import urllib.error
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Optional
-import anthropic
+from typing import Iterable, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: index writes go unlocked
+    fcntl = None
 
 
 
@@ -50,6 +64,44 @@ import anthropic
 MAX_TOKENS = 4000
 TIMEOUT_SECONDS = 90
 
+# Most recent items kept per category; these are all the prompt ever consumes
+MAX_USER_MESSAGES = 20
+MAX_ASSISTANT_MESSAGES = 20
+MAX_TOOL_CALLS = 50
+
+# Individual messages are truncated to this many characters
+MAX_MESSAGE_CHARS = 2000
+
+# The transcript is searched backwards for the last compaction in blocks of this size
+TRANSCRIPT_TAIL_BLOCK = 1024 * 1024
+
+# Memories index: append-only JSONL, trimmed back to the newest entries
+INDEX_FILENAME = "index.jsonl"
+# Older releases kept the index as one JSON document, newest entry first
+LEGACY_INDEX_FILENAME = "index.json"
+MAX_INDEX_ENTRIES = 100
+INDEX_TRIM_THRESHOLD = 500
+# Every entry is well over 128 bytes, so an index below this size cannot have
+# reached INDEX_TRIM_THRESHOLD lines and is not read at all
+INDEX_TRIM_MIN_BYTES = 64 * 1024
+
+# Nowledge REST endpoint; an unreachable server fails fast with ECONNREFUSED,
+# the timeout only bounds a server that accepts but never answers
+NOWLEDGE_API_URL = "http://127.0.0.1:14242/memories"
+NOWLEDGE_TIMEOUT_SECONDS = 5
+
+# Tool calls that modify the file named in their input
+FILE_EDIT_TOOLS = frozenset({'Edit', 'Write', 'MultiEdit', 'NotebookEdit'})
+
+# Hashtags in the generated memory become topics
+_HASHTAG_RE = re.compile(r'#(\w+)')
+
+# Fallback extraction of fields from a malformed or truncated LLM JSON response
+_SUMMARY_FIELD_RE = re.compile(r'"(?:k|n)owledge_summary"\s*:\s*"(.*?)"\s*,\s*"\w+', re.DOTALL)
+_SUMMARY_FIELD_TRUNCATED_RE = re.compile(r'"(?:k|n)owledge_summary"\s*:\s*"(.*)', re.DOTALL)
+_FULL_MEMORY_FIELD_RE = re.compile(r'"full_memory"\s*:\s*"(.*)', re.DOTALL)
+_TRAILING_CLOSE_RE = re.compile(r'"\s*}\s*$')
+
 # ============================================================================
 # Type Safety Helpers
 # ============================================================================
@@ -66,6 +118,38 @@ def ensure_string(value, default=""):
         return value
     return default
 
+# ============================================================================
+# JSON Helpers
+# ============================================================================
+
+def json_loads(data: bytes | str):
+    """Decode JSON, using orjson when available (accepts bytes without decoding)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj, indent: bool = False) -> bytes:
+    """Encode obj as UTF-8 JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+
+def json_preview(items: list[str], limit: int) -> str:
+    """
+    Pretty-printed JSON array of strings for a prompt, cut to at most limit characters.
+
+    Every string encodes to at least its own length, so the strings past the
+    point where the cut must fall are dropped before encoding, not after.
+    """
+    size = 0
+    for count, item in enumerate(items, 1):
+        size += len(item)
+        if size > limit:
+            items = items[:count]
+            break
+    return json_dumps(items, indent=True).decode('utf-8')[:limit]
+
 # ============================================================================
 # Input/Output Helpers
 # ============================================================================
@@ -76,16 +160,23 @@ import logging
 # Logging Configuration
 # ============================================================================
 
+# Status goes to stdout; warnings and errors are repeated on stderr so they
+# surface when the hook fails. CONTEXT_KEEPER_DEBUG enables debug output and
+# the debug log file.
+DEBUG_LOGGING = bool(os.environ.get('CONTEXT_KEEPER_DEBUG'))
+
+_stderr_handler = logging.StreamHandler(sys.stderr)
+_stderr_handler.setLevel(logging.WARNING)
+_log_handlers = [logging.StreamHandler(sys.stdout), _stderr_handler]
+if DEBUG_LOGGING:
+    _log_handlers.append(logging.FileHandler('/tmp/context-keeper-memory-debug.log'))
+
 # Configure logging
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=logging.DEBUG if DEBUG_LOGGING else logging.INFO,
     format='[%(asctime)s] [%(funcName)s] %(levelname)s: %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        logging.FileHandler('/tmp/context-keeper-memory-debug.log'),
-        logging.StreamHandler(sys.stdout),
-        logging.StreamHandler(sys.stderr)
-    ]
+    handlers=_log_handlers
 )
 
 
@@ -93,51 +184,134 @@ logging.basicConfig(
 # Transcript Parsing
 # ============================================================================
 
-def parse_transcript(transcript_path: str) -> list[dict]:
-    """Parse JSONL transcript file into messages."""
-    messages = []
+def iter_lines_reversed(path: str) -> Iterator[tuple[int, bytes]]:
+    """
+    Yield (byte offset, line) pairs of a file last to first, reading it
+    backwards in TRANSCRIPT_TAIL_BLOCK chunks.
+    """
+    with open(path, 'rb') as f:
+        pos = f.seek(0, 2)
+        partial = b''
+        while pos > 0:
+            size = min(TRANSCRIPT_TAIL_BLOCK, pos)
+            pos -= size
+            f.seek(pos)
+            buf = f.read(size) + partial
+            lines = buf.split(b'\n')
+            # The first piece may continue in the previous block
+            partial = lines[0]
+            end = pos + len(buf)
+            for line in reversed(lines[1:]):
+                end -= len(line)
+                yield end, line
+                end -= 1
+        yield 0, partial
+
+
+def parse_transcript(transcript_path: str, start_offset: int = 0) -> Iterator[dict]:
+    """
+    Stream JSONL transcript file, yielding one parsed message per line.
+
+    Parsing starts at start_offset, which must be the start of a line.
+    """
     path = Path(transcript_path).expanduser()
 
     if not path.exists():
         logging.error(f"Transcript file not found: {transcript_path}")
-        return messages
+        return
 
     try:
-        with open(path, 'r', encoding='utf-8') as f:
+        with open(path, 'rb') as f:
+            f.seek(start_offset)
+            # Line by line: only one raw line is held in memory at a time
             for line_num, line in enumerate(f, 1):
-                if line.strip():
-                    try:
-                        messages.append(json.loads(line))
-                    except json.JSONDecodeError:
-                        logging.error(f"Failed to parse line {line_num} in transcript")
+                if not line.strip():
+                    continue
+                try:
+                    yield json_loads(line)
+                except json.JSONDecodeError:
+                    logging.error(f"Failed to parse line {line_num} in transcript")
     except Exception as e:
         logging.error(f"Failed to read transcript: {e}")
 
-    return messages
 
+def append_text_content(content, out: deque, skip_reminders: bool = False) -> int:
+    """
+    Append the text of a message's content (a string or a list of blocks) to out.
 
-def extract_conversation_content(messages: list[dict], start_cutoff: Optional[str] = None) -> dict:
+    Returns the number of text entries appended.
+    """
+    if isinstance(content, str):
+        # isspace() tests for blank content without copying it the way strip() would
+        if content and not content.isspace() and not (skip_reminders and '<system-reminder>' in content):
+            out.append(content[:MAX_MESSAGE_CHARS])
+            return 1
+        return 0
+
+    appended = 0
+    if isinstance(content, list):
+        for block in content:
+            if isinstance(block, dict) and block.get('type') == 'text':
+                text = block.get('text', '')
+                if text and not (skip_reminders and '<system-reminder>' in text):
+                    out.append(text[:MAX_MESSAGE_CHARS])
+                    appended += 1
+    return appended
+
+
+def record_tool_call(tool_name: str, tool_input: dict, tool_calls: deque, files_modified: set):
+    """Record a tool call and track the file it modifies, if any."""
+    tool_calls.append({
+        'tool': tool_name,
+        'input': tool_input
+    })
+    if tool_name in FILE_EDIT_TOOLS:
+        file_path = tool_input.get('file_path', tool_input.get('notebook_path', ''))
+        if file_path:
+            # Raw paths are collected here; relative_paths() converts the deduplicated set once
+            files_modified.add(file_path)
+
+
+def relative_paths(paths: Iterable[str]) -> set:
+    """Convert paths to be relative to the current directory."""
+    cwd = os.getcwd()
+    result = set()
+    for file_path in paths:
+        try:
+            result.add(os.path.relpath(file_path, cwd))
+        except ValueError:
+            # Fallback if path is on different drive or invalid
+            result.add(file_path)
+    return result
+
+
+def extract_conversation_content(messages: Iterable[dict], start_cutoff: Optional[str] = None) -> dict:
     """
     Extract user and assistant messages, identifying tools and modified files.
-    
+
+    The messages are consumed in a single pass, so a streaming iterator such as
+    the one returned by parse_transcript() never has to be materialized.
+
     Args:
-        messages: List of message dictionaries
+        messages: Iterable of message dictionaries
         start_cutoff: Optional timestamp (ISO string). If provided, only messages created AFTER this time are included.
     """
-    user_messages = []
-    assistant_messages = []
-    tool_calls = []
+    # Bounded buffers: only the most recent entries reach the prompt
+    user_messages = deque(maxlen=MAX_USER_MESSAGES)
+    assistant_messages = deque(maxlen=MAX_ASSISTANT_MESSAGES)
+    tool_calls = deque(maxlen=MAX_TOOL_CALLS)
     files_modified = set()
-    
-    # Ensure we have a list of messages
-    if not isinstance(messages, list):
-        logging.debug(f"Expected list of messages, got {type(messages)}")
-        messages = []
+    transcript_message_count = 0
+    user_count = 0
+    assistant_count = 0
+    tool_call_count = 0
 
     start_time = None
     end_time = None
 
     for msg in messages:
+        transcript_message_count += 1
+
         # Skip invalid messages
         if not isinstance(msg, dict):
             continue
@@ -163,90 +337,43 @@ def extract_conversation_content(messages: list[dict], start_cutoff: Optional[st
                 end_time = ts
 
         role = nested_msg.get('role', '')
-        content = nested_msg.get('content', '') if isinstance(nested_msg, dict) else msg.get('content', '')
+        content = nested_msg.get('content', '')
 
         # User messages
         if msg_type == 'user' or role == 'user':
-            if isinstance(content, str) and content.strip():
-                # Skip system reminders
-                if '<system-reminder>' not in content:
-                    user_messages.append(content[:2000])
-            elif isinstance(content, list) and content:
-                for block in content:
-                    if isinstance(block, dict) and block.get('type') == 'text':
-                        text = block.get('text', '')
-                        if text and '<system-reminder>' not in text:
-                            user_messages.append(text[:2000])
+            user_count += append_text_content(content, user_messages, skip_reminders=True)
 
         # Assistant messages
         elif msg_type == 'assistant' or role == 'assistant':
-            if isinstance(content, str) and content.strip():
-                assistant_messages.append(content[:2000])
-            elif isinstance(content, list) and content:
+            assistant_count += append_text_content(content, assistant_messages)
+            if isinstance(content, list):
                 for block in content:
-                    if isinstance(block, dict):
-                        block_type = block.get('type', '')
-                        if block_type == 'text':
-                            text = block.get('text', '')
-                            if text:
-                                assistant_messages.append(text[:2000])
-                        elif block_type == 'tool_use':
-                            tool_name = block.get('name', 'unknown')
-                            tool_input = block.get('input', {})
-                            tool_calls.append({
-                                'tool': tool_name,
-                                'input': tool_input
-                            })
-                            # Track file modifications
-                            if tool_name in ['Edit', 'Write', 'MultiEdit', 'NotebookEdit']:
-                                file_path = tool_input.get('file_path', tool_input.get('notebook_path', ''))
-                                if file_path:
-                                    try:
-                                        rel_path = os.path.relpath(file_path, os.getcwd())
-                                        files_modified.add(rel_path)
-                                    except ValueError:
-                                        # Fallback if path is on different drive or invalid
-                                        files_modified.add(file_path)
+                    if isinstance(block, dict) and block.get('type') == 'tool_use':
+                        record_tool_call(block.get('name', 'unknown'), block.get('input', {}), tool_calls, files_modified)
+                        tool_call_count += 1
 
         # Handle tool_use messages directly (older format)
         elif msg_type == 'tool_use':
-            tool_name = msg.get('name', 'unknown')
-            tool_input = msg.get('input', {})
-            tool_calls.append({
-                'tool': tool_name,
-                'input': tool_input
-            })
-            if tool_name in ['Edit', 'Write', 'MultiEdit', 'NotebookEdit']:
-                file_path = tool_input.get('file_path', tool_input.get('notebook_path', ''))
-                if file_path:
-                    try:
-                        rel_path = os.path.relpath(file_path, os.getcwd())
-                        files_modified.add(rel_path)
-                    except ValueError:
-                        files_modified.add(file_path)
-
-    # Debug the values before returning
-    logging.debug(f"[DEBUG] Before return - user_messages type: {type(user_messages)}, len: {len(user_messages) if isinstance(user_messages, list) else 'N/A'}")
-    logging.debug(f"[DEBUG] Before return - assistant_messages type: {type(assistant_messages)}, len: {len(assistant_messages) if isinstance(assistant_messages, list) else 'N/A'}")
-    logging.debug(f"[DEBUG] Before return - tool_calls type: {type(tool_calls)}, len: {len(tool_calls) if isinstance(tool_calls, list) else 'N/A'}")
-    logging.debug(f"[DEBUG] Before return - files_modified type: {type(list(files_modified))}, len: {len(list(files_modified))}")
-    logging.debug(f"[DEBUG] Before return - message_count: {len(messages)}")
-
-    logging.debug(f"Extracted {len(user_messages)} user msgs, {len(assistant_messages)} assistant msgs")
-    logging.debug(f"Found {len(tool_calls)} tool calls, {len(files_modified)} modified files")
+            record_tool_call(msg.get('name', 'unknown'), msg.get('input', {}), tool_calls, files_modified)
+            tool_call_count += 1
+
+    files_modified = relative_paths(files_modified)
+
+    logging.debug(f"Extracted {user_count} user msgs, {assistant_count} assistant msgs")
+    logging.debug(f"Found {tool_call_count} tool calls, {len(files_modified)} modified files")
     logging.debug(f"Session timeline: {start_time} to {end_time}")
 
     result = {
-        "text": "\n\n".join(user_messages + assistant_messages),
-        "user_messages": user_messages,
-        "assistant_messages": assistant_messages,
-        "tool_calls": tool_calls,
-        "files_modified": list(files_modified),
-        "message_count": len(user_messages) + len(assistant_messages),
+        "user_messages": list(user_messages),
+        "assistant_messages": list(assistant_messages),
+        "tool_calls": list(tool_calls),
+        "tool_call_count": tool_call_count,
+        "files_modified": sorted(files_modified),
+        "message_count": user_count + assistant_count,
+        "transcript_message_count": transcript_message_count,
         "start_time": start_time,
         "end_time": end_time
     }
-    logging.debug(f"[DEBUG] Returning dict with keys: {list(result.keys())}")
     return result
 
 
@@ -254,9 +381,12 @@ def extract_conversation_content(messages: list[dict], start_cutoff: Optional[st
 # Summary Generation
 # ============================================================================
 
+@functools.lru_cache(maxsize=1)
 def get_summary_config() -> tuple[str | None, str | None, str | None]:
     """
     Get summary API configuration from ~/.claude/settings.json.
+
+    The result is cached for the lifetime of the (short-lived) hook process.
     Returns: (api_key, api_url, model_name)
     """
     config_path = Path.home() / ".claude" / "settings.json"
@@ -267,8 +397,7 @@ def get_summary_config() -> tuple[str | None, str | None, str | None]:
         return None, None, None
 
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        config = json_loads(config_path.read_bytes())
         
         env = config.get("env", {})
         logging.debug(f"Loaded env keys: {list(env.keys())}")
@@ -294,8 +423,37 @@ def get_summary_config() -> tuple[str | None, str | None, str | None]:
         return None, None, None
 
 
-def ensure_list(value):
-    return value if isinstance(value, list) else []
+@functools.lru_cache(maxsize=1)
+def get_anthropic_client(api_key: str, api_url: Optional[str]):
+    """
+    Build the Anthropic client, bounded by TIMEOUT_SECONDS.
+
+    Cached so that any further request in this process reuses the client's
+    pooled HTTP connection instead of repeating the DNS and TLS handshake.
+    """
+    import anthropic
+
+    if api_url:
+        logging.debug(f"Creating Anthropic client with custom base_url: {api_url}")
+        logging.info(f"Using custom API URL: {api_url}")
+        return anthropic.Anthropic(api_key=api_key, base_url=api_url, timeout=TIMEOUT_SECONDS)
+
+    logging.debug("Creating Anthropic client with default base_url")
+    return anthropic.Anthropic(api_key=api_key, timeout=TIMEOUT_SECONDS)
+
+
+def prompt_messages(messages: list, limit: int, skip_reminders: bool = False) -> list[str]:
+    """
+    The first limit non-blank string messages, optionally skipping system reminders.
+
+    Filtering stops as soon as limit messages are found.
+    """
+    selected = (
+        msg for msg in messages
+        if isinstance(msg, str) and msg and not msg.isspace()
+        and not (skip_reminders and '<system-reminder>' in msg)
+    )
+    return list(islice(selected, limit))
 
 
 def generate_memory_with_llm(content: dict, session_info: dict) -> Optional[str]:
@@ -307,14 +465,17 @@ def generate_memory_with_llm(content: dict, session_info: dict) -> Optional[str]
         logging.debug("=== generate_memory_with_llm() END (no API key) ===")
         return None
 
+    # Check for the SDK without importing it (the import pulls in httpx, pydantic, ...)
+    if importlib.util.find_spec("anthropic") is None:
+        logging.error("The 'anthropic' package is not installed")
+        print("❌ [context-keeper] Missing dependency: install the 'anthropic' package", file=sys.stderr)
+        return None
+
     logging.debug("=== generate_memory_with_llm() START ===")
     logging.debug(f"API key obtained, length: {len(api_key)} chars")
 
     # Prepare content for summarization (truncate to avoid token limits)
     # Ensure all values are lists before slicing
-    logging.debug(f"[DEBUG] Content type: {type(content)}")
-    logging.debug(f"[DEBUG] Content keys: {list(content.keys()) if isinstance(content, dict) else 'Not a dict'}")
-
     user_msgs_list = content.get('user_messages', [])
     assistant_msgs_list = content.get('assistant_messages', [])
     tool_calls_list = content.get('tool_calls', [])
@@ -327,26 +488,11 @@ def generate_memory_with_llm(content: dict, session_info: dict) -> Optional[str]
     files_modified_list = ensure_list(files_modified_list)
 
     # Slice appropriately for the context window
-    user_msgs = user_msgs_list[-20:]
-    assistant_msgs = assistant_msgs_list[-20:] 
-    tool_calls = tool_calls_list[-50:]
+    user_msgs = user_msgs_list[-MAX_USER_MESSAGES:]
+    assistant_msgs = assistant_msgs_list[-MAX_ASSISTANT_MESSAGES:]
+    tool_calls = tool_calls_list[-MAX_TOOL_CALLS:]
     files_modified = files_modified_list
 
-
-    # Debug the types we got
-    logging.debug(f"[DEBUG] user_msgs type: {type(user_msgs)}, len: {len(user_msgs) if isinstance(user_msgs, list) else 'not list'}")
-    logging.debug(f"[DEBUG] assistant_msgs type: {type(assistant_msgs)}, len: {len(assistant_msgs) if isinstance(assistant_msgs, list) else 'not list'}")
-    logging.debug(f"[DEBUG] tool_calls type: {type(tool_calls)}, len: {len(tool_calls) if isinstance(tool_calls, list) else 'not list'}")
-    logging.debug(f"[DEBUG] files_modified type: {type(files_modified)}, len: {len(files_modified) if isinstance(files_modified, list) else 'not list'}")
-
-    # Check first elements of each list
-    if isinstance(user_msgs, list) and len(user_msgs) > 0:
-        logging.debug(f"[DEBUG] First user_msg type: {type(user_msgs[0])}")
-    if isinstance(assistant_msgs, list) and len(assistant_msgs) > 0:
-        logging.debug(f"[DEBUG] First assistant_msg type: {type(assistant_msgs[0])}")
-    if isinstance(tool_calls, list) and len(tool_calls) > 0:
-        logging.debug(f"[DEBUG] First tool_call type: {type(tool_calls[0])}")
-
     # Build custom instructions section if provided
     custom_instructions = session_info.get('custom_instructions', '')
     custom_section = ""
@@ -400,10 +546,10 @@ def generate_memory_with_llm(content: dict, session_info: dict) -> Optional[str]
     - Raw tool outputs without context
 
     ## Key Messages Preserved
-    {json.dumps([msg for msg in user_msgs if isinstance(msg, str) and len(str(msg).strip()) > 0 and '<system-reminder>' not in str(msg)][:15], indent=2, ensure_ascii=False)[:3000]}
+    {json_preview(prompt_messages(user_msgs, 15, skip_reminders=True), 3000)}
 
     ## Key Assistant Responses
-    {json.dumps([msg for msg in assistant_msgs if isinstance(msg, str) and len(str(msg).strip()) > 0][:15], indent=2, ensure_ascii=False)[:3000]}
+    {json_preview(prompt_messages(assistant_msgs, 15), 3000)}
 
     ---
 
@@ -473,24 +619,8 @@ def generate_memory_with_llm(content: dict, session_info: dict) -> Optional[str]
     logging.debug("[DEBUG] Prompt string built successfully, about to call API...")
 
     try:
-        # Get configuration
-        api_key, api_url, model_name = get_summary_config()
-        
-        if not api_key:
-            logging.error("No summary API key found in ~/.claude/settings.json")
-            print("❌ [context-keeper] Missing API Key: Ensure CLAUDE_SUMMARY_API_KEY is set in ~/.claude/settings.json", file=sys.stderr)
-            return None
-
-        # Build client with optional custom base URL
         logging.debug(f"API URL obtained: {api_url if api_url else 'None (using default)'}")
-
-        if api_url:
-            logging.debug(f"Creating Anthropic client with custom base_url: {api_url}")
-            client = anthropic.Anthropic(api_key=api_key, base_url=api_url)
-            logging.info(f"Using custom API URL: {api_url}")
-        else:
-            logging.debug("Creating Anthropic client with default base_url")
-            client = anthropic.Anthropic(api_key=api_key)
+        client = get_anthropic_client(api_key, api_url)
 
         if not model_name:
             # Fallback default if not in config
@@ -503,82 +633,75 @@ def generate_memory_with_llm(content: dict, session_info: dict) -> Optional[str]
             messages=[{"role": "user", "content": prompt}]
         )
 
-        # Safely extract text from response
-        # Safely extract text from response
-        if hasattr(response, 'content') and response.content and len(response.content) > 0:
-            content_block = response.content[0]
-            if hasattr(content_block, 'text'):
-                response_text = content_block.text
-                logging.debug(f"LLM response received, content length: {len(response_text)} chars")
+        # Extract the text of the first content block; anything else is an unexpected response
+        try:
+            response_text = response.content[0].text
+        except (AttributeError, IndexError, TypeError) as e:
+            logging.error(f"Unexpected response structure: {type(response)} ({e})")
+            logging.debug("=== generate_memory_with_llm() END (failed to extract text) ===")
+            return None
+        logging.debug(f"LLM response received, content length: {len(response_text)} chars")
+        
+        # Try to parse as JSON
+        try:
+            # Clean potential markdown wrapping
+            if "```json" in response_text:
+                response_text = response_text.split("```json")[1].split("```")[0].strip()
+            elif "```" in response_text:
+                response_text = response_text.split("```")[1].split("```")[0].strip()
                 
-                # Try to parse as JSON
-                try:
-                    # Clean potential markdown wrapping
-                    if "```json" in response_text:
-                        response_text = response_text.split("```json")[1].split("```")[0].strip()
-                    elif "```" in response_text:
-                        response_text = response_text.split("```")[1].split("```")[0].strip()
-                        
-                    data = json.loads(response_text)
-                    logging.debug("Successfully parsed JSON response")
-                    logging.debug(f"Keys found: {list(data.keys())}")
-                    
-                    # Validate keys
-                    if "full_memory" in data and "nowledge_summary" in data:
-                        logging.debug("=== generate_memory_with_llm() END (success) ===")
-                        return data
-                    else:
-                        logging.warning(f"Missing required keys in JSON response. Found: {list(data.keys())}")
-                        return None
-
-                except json.JSONDecodeError as e:
-                    logging.error(f"Failed to parse JSON response: {e}")
-                    logging.debug(f"Raw response: {response_text[:500]}...")
-                    
-                    # FALLBACK: Try regex extraction if JSON is malformed/truncated
-                    logging.info("Attempting regex fallback extraction...")
-                    try:
-                        extracted_data = {}
-                        
-                        # 1. Extract nowledge_summary/knowledge_summary
-                        # Match: "key": "value", (non-greedy)
-                        ns_match = re.search(r'"(?:k|n)owledge_summary"\s*:\s*"(.*?)"\s*,\s*"\w+', response_text, re.DOTALL)
-                        if not ns_match:
-                             # Try matching up to end of string if truncated inside the next key
-                             ns_match = re.search(r'"(?:k|n)owledge_summary"\s*:\s*"(.*)', response_text, re.DOTALL)
-                        
-                        if ns_match:
-                            summary_text = ns_match.group(1)
-                            # Cleanup unescaped quotes if valid JSON failed, though raw text might be messy
-                            # Simple fix for basic escaped quotes
-                            summary_text = summary_text.replace('\\"', '"').replace('\\n', '\n')
-                            extracted_data["nowledge_summary"] = summary_text
-                        
-                        # 2. Extract full_memory
-                        fm_match = re.search(r'"full_memory"\s*:\s*"(.*)', response_text, re.DOTALL)
-                        if fm_match:
-                            fm_text = fm_match.group(1)
-                            # Remove trailing " or } if present at the very end
-                            fm_text = re.sub(r'"\s*}\s*$', '', fm_text)
-                            fm_text = fm_text.replace('\\"', '"').replace('\\n', '\n')
-                            extracted_data["full_memory"] = fm_text
-                        
-                        if "nowledge_summary" in extracted_data:
-                            logging.info("Regex fallback successful")
-                            return extracted_data
-                            
-                    except Exception as regex_e:
-                        logging.error(f"Regex fallback failed: {regex_e}")
-
-                    return None
+            data = json_loads(response_text)
+            logging.debug("Successfully parsed JSON response")
+            logging.debug(f"Keys found: {list(data.keys())}")
+            
+            # Validate keys
+            if "full_memory" in data and "nowledge_summary" in data:
+                logging.debug("=== generate_memory_with_llm() END (success) ===")
+                return data
             else:
-                logging.error(f"Content block missing 'text' attribute, type: {type(content_block)}")
-        else:
-            logging.error(f"Unexpected response structure: {type(response)}")
-            logging.error(f"Response content: {getattr(response, 'content', 'No content attr')}")
+                logging.warning(f"Missing required keys in JSON response. Found: {list(data.keys())}")
+                return None
 
-        logging.debug("=== generate_memory_with_llm() END (failed to extract text) ===")
-        return None
+        except json.JSONDecodeError as e:
+            logging.error(f"Failed to parse JSON response: {e}")
+            logging.debug(f"Raw response: {response_text[:500]}...")
+            
+            # FALLBACK: Try regex extraction if JSON is malformed/truncated
+            logging.info("Attempting regex fallback extraction...")
+            try:
+                extracted_data = {}
+                
+                # 1. Extract nowledge_summary/knowledge_summary
+                # Match: "key": "value", (non-greedy)
+                ns_match = _SUMMARY_FIELD_RE.search(response_text)
+                if not ns_match:
+                     # Try matching up to end of string if truncated inside the next key
+                     ns_match = _SUMMARY_FIELD_TRUNCATED_RE.search(response_text)
+                
+                if ns_match:
+                    summary_text = ns_match.group(1)
+                    # Cleanup unescaped quotes if valid JSON failed, though raw text might be messy
+                    # Simple fix for basic escaped quotes
+                    summary_text = summary_text.replace('\\"', '"').replace('\\n', '\n')
+                    extracted_data["nowledge_summary"] = summary_text
+                
+                # 2. Extract full_memory
+                fm_match = _FULL_MEMORY_FIELD_RE.search(response_text)
+                if fm_match:
+                    fm_text = fm_match.group(1)
+                    # Remove trailing " or } if present at the very end
+                    fm_text = _TRAILING_CLOSE_RE.sub('', fm_text)
+                    fm_text = fm_text.replace('\\"', '"').replace('\\n', '\n')
+                    extracted_data["full_memory"] = fm_text
+                
+                if "nowledge_summary" in extracted_data:
+                    logging.info("Regex fallback successful")
+                    return extracted_data
+                    
+            except Exception as regex_e:
+                logging.error(f"Regex fallback failed: {regex_e}")
+
+            return None
     except Exception as e:
         logging.error(f"LLM summarization failed: {e}")
         print(f"❌ [context-keeper] LLM Generation Failed: {e}", file=sys.stderr)
@@ -602,69 +725,112 @@ def generate_memory(content: dict, session_info: dict) -> dict | str:
     return None
 
 
+def content_hash(content: dict, session_info: dict) -> str:
+    """
+    Hash everything the memory prompt depends on, except the clock.
+
+    Two runs over the same conversation with the same model and instructions
+    get the same hash, so the second has nothing new to save.
+    """
+    _, _, model_name = get_summary_config()
+    key_data = json_dumps([
+        content,
+        session_info.get('session_id'),
+        session_info.get('cwd'),
+        session_info.get('custom_instructions'),
+        model_name
+    ])
+    return hashlib.blake2b(key_data, digest_size=16).hexdigest()
+
+
+def is_memory_current(project_path: str, session_id: str, key: str) -> bool:
+    """Whether the session's latest memory was generated from content with this hash."""
+    latest_path = get_memories_dir(project_path) / session_id / "latest" / "memory.json"
+    try:
+        memory_data = json_loads(latest_path.read_bytes())
+    except (OSError, json.JSONDecodeError):
+        return False
+    return memory_data.get('metadata', {}).get('content_hash') == key
+
+
 # ============================================================================
 # File Storage helpers
 # ============================================================================
 
-def get_last_compact_time(session_id: str, project_path: str = None, transcript_path: str = None) -> Optional[str]:
+def get_last_compaction(session_id: str, project_path: str = None, transcript_path: str = None) -> tuple[Optional[str], int]:
     """
-    Get the timestamp (event_end) of the last compaction for this session.
-    
+    Get the timestamp (event_end) of the last compaction for this session,
+    and the transcript byte offset to start parsing from.
+
     Strategy:
     1. Scan the transcript file for 'compact_boundary' events (most reliable).
-    2. Fallback to local metadata.json if transcript scan fails.
+       The offset is that of the boundary line: everything before it is older
+       than the cutoff, so only the lines since the compaction are re-parsed.
+    2. Fallback to the latest memory's metadata if transcript scan fails
+       (offset 0, the whole transcript is parsed).
     """
     # 1. Try scanning transcript_path if provided
     if transcript_path and os.path.exists(transcript_path):
         try:
-            found_timestamps = []
-            with open(transcript_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    # Check for system compact event
-                    if '"subtype":"compact_boundary"' in line or '"subtype": "compact_boundary"' in line:
-                         try:
-                             data = json.loads(line)
-                             if data.get("timestamp"):
-                                 found_timestamps.append(data.get("timestamp"))
-                         except json.JSONDecodeError:
-                             pass
-                    # Check for stdout marker (fallback)
-                    elif "Compacted" in line and "<local-command-stdout>" in line:
-                        try:
-                             data = json.loads(line)
-                             if data.get("timestamp"):
-                                 found_timestamps.append(data.get("timestamp"))
-                        except json.JSONDecodeError:
-                             pass
-            
-            if found_timestamps:
-                # Sort timestamps to ensure we get the absolute latest, 
-                # strictly following user requirement to sort and pick latest.
-                found_timestamps.sort(reverse=True)
-                return found_timestamps[0]
-                
+            # The transcript is append-only, so the last compaction is the one
+            # nearest the end: scan backwards and stop at the first match.
+            # Raw byte scan: only candidate lines are decoded and parsed
+            for offset, line in iter_lines_reversed(transcript_path):
+                # Check for system compact event, or the stdout marker (fallback)
+                if (b'"subtype":"compact_boundary"' in line or b'"subtype": "compact_boundary"' in line
+                        or (b"Compacted" in line and b"<local-command-stdout>" in line)):
+                    try:
+                        timestamp = json_loads(line).get("timestamp")
+                    except json.JSONDecodeError:
+                        continue
+                    if timestamp:
+                        return timestamp, offset
+
         except Exception as e:
             logging.warning(f"Failed to scan transcript for compaction time: {e}")
 
     # 2. Try local metadata first (fastest)
     try:
-        memories_dir = get_memories_dir(project_path)
-        latest_meta_path = memories_dir / session_id / "latest" / "metadata.json"
-        
-        if latest_meta_path.exists():
-            meta = json.loads(latest_meta_path.read_text(encoding='utf-8'))
-            # Prefer event_end (actual message time), fallback to timestamp (creation time)
-            return meta.get("event_end") or meta.get("timestamp")
+        latest_dir = get_memories_dir(project_path) / session_id / "latest"
+
+        # memory.json embeds the metadata; older memories only have metadata.json
+        meta = None
+        try:
+            meta = json_loads((latest_dir / "memory.json").read_bytes()).get("metadata")
+        except FileNotFoundError:
+            pass
+        if meta is None:
+            try:
+                meta = json_loads((latest_dir / "metadata.json").read_bytes())
+            except FileNotFoundError:
+                return None, 0
+
+        # Prefer event_end (actual message time), fallback to timestamp (creation time)
+        return meta.get("event_end") or meta.get("timestamp"), 0
     except Exception as e:
         logging.warning(f"Failed to read last compaction time locally: {e}")
         
-    return None
+    return None, 0
 
 def get_memories_dir(project_path: str) -> Path:
     """Get the memories directory for the project."""
     return Path(project_path) / ".claude" / "memories"
 
 
+def write_bytes_atomic(path: Path, data: bytes):
+    """
+    Write data to path through a temp file renamed over it, so readers see
+    either the old file or the complete new one, never a partial write.
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
 def save_memory(
     session_id: str,
     memory: dict | str,
@@ -686,29 +852,30 @@ def save_memory(
     session_dir = memories_dir / session_id / timestamp
     session_dir.mkdir(parents=True, exist_ok=True)
 
-    # Save memory as JSON
+    # Recorded on the caller's dict too, so the nowledge upload carries it
+    metadata['memory_timestamp'] = timestamp
+
+    # Save memory as JSON, with the metadata embedded: one file per memory,
+    # and loading the latest memory is a single read
     memory_data = {
         "content": full_memory,
         "timestamp": timestamp,
-        "session_id": session_id
+        "session_id": session_id,
+        "metadata": metadata
     }
     memory_path = session_dir / "memory.json"
-    memory_path.write_text(json.dumps(memory_data, indent=2, ensure_ascii=False), encoding='utf-8')
+    # Two saves within the same second share a directory, and 'latest' may
+    # already point at it
+    write_bytes_atomic(memory_path, json_dumps(memory_data, indent=True))
 
-    # Save metadata
-    metadata['memory_timestamp'] = timestamp
-    metadata_path = session_dir / "metadata.json"
-    metadata_path.write_text(json.dumps(metadata, indent=2, ensure_ascii=False), encoding='utf-8')
-
-    # Update latest symlink
+    # Update latest symlink: build the new link aside and rename it over the
+    # old one, so readers never see a missing 'latest'
     latest_link = memories_dir / session_id / "latest"
-    if latest_link.is_symlink():
-        latest_link.unlink()
-    elif latest_link.exists():
-        latest_link.unlink()
-
+    tmp_link = latest_link.with_name(f".latest.{os.getpid()}")
     try:
-        latest_link.symlink_to(timestamp)
+        tmp_link.unlink(missing_ok=True)
+        tmp_link.symlink_to(timestamp)
+        os.replace(tmp_link, latest_link)
     except OSError as e:
         logging.error(f"Failed to create latest symlink: {e}")
 
@@ -719,18 +886,14 @@ def save_memory(
 
 
 def update_index(memories_dir: Path, session_id: str, timestamp: str, metadata: dict):
-    """Update the memories index file."""
-    index_path = memories_dir / "index.json"
+    """
+    Append an entry to the memories index.
 
-    if index_path.exists():
-        try:
-            index = json.loads(index_path.read_text(encoding='utf-8'))
-        except json.JSONDecodeError:
-            index = {"memories": [], "last_session": None}
-    else:
-        index = {"memories": [], "last_session": None}
+    The index is append-only JSONL (oldest first), so a save writes one line
+    instead of re-reading and re-serializing every previous entry.
+    """
+    index_path = memories_dir / INDEX_FILENAME
 
-    # Add new entry at the beginning
     entry = {
         "session_id": session_id,
         "timestamp": timestamp,
@@ -741,15 +904,64 @@ def update_index(memories_dir: Path, session_id: str, timestamp: str, metadata:
         "memory_path": f"{session_id}/{timestamp}/memory.json"
     }
 
-    index["memories"].insert(0, entry)
-    index["last_session"] = session_id
-
-    # Keep only last 100 entries
-    index["memories"] = index["memories"][:100]
-
     # Ensure directory exists
     memories_dir.mkdir(parents=True, exist_ok=True)
-    index_path.write_text(json.dumps(index, indent=2, ensure_ascii=False), encoding='utf-8')
+    migrate_legacy_index(index_path)
+
+    # The lock covers the trim too, so no concurrent hook can append between
+    # the trim reading the index and replacing it
+    with open_index_locked(index_path) as f:
+        f.write(json_dumps(entry) + b'\n')
+        f.flush()
+        trim_index(index_path)
+
+
+def open_index_locked(index_path: Path):
+    """
+    Open the index for appending, holding an exclusive flock until it is closed.
+
+    A trim replaces the index with a new file, so a writer that waited on the
+    old one reopens the path rather than append to an unlinked inode.
+    """
+    while True:
+        f = open(index_path, 'ab')
+        if fcntl is None:
+            return f
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            if os.fstat(f.fileno()).st_ino == os.stat(index_path).st_ino:
+                return f
+        except FileNotFoundError:
+            pass
+        f.close()
+
+
+def migrate_legacy_index(index_path: Path):
+    """Convert a legacy index.json (newest first) into index.jsonl (oldest first), once."""
+    if index_path.exists():
+        return
+    try:
+        legacy = json_loads(index_path.with_name(LEGACY_INDEX_FILENAME).read_bytes())
+        entries = [entry for entry in reversed(legacy.get("memories", [])) if isinstance(entry, dict)]
+    except (OSError, json.JSONDecodeError, AttributeError, TypeError):
+        return
+    write_bytes_atomic(index_path, b''.join(json_dumps(entry) + b'\n' for entry in entries))
+
+
+def trim_index(index_path: Path):
+    """Cut the index back to the newest MAX_INDEX_ENTRIES once it grows past INDEX_TRIM_THRESHOLD lines."""
+    if index_path.stat().st_size <= INDEX_TRIM_MIN_BYTES:
+        return
+
+    with open(index_path, 'rb') as f:
+        line_count = sum(1 for _ in f)
+    if line_count <= INDEX_TRIM_THRESHOLD:
+        return
+
+    with open(index_path, 'rb') as f:
+        tail = deque(f, maxlen=MAX_INDEX_ENTRIES)
+
+    write_bytes_atomic(index_path, b''.join(tail))
 
 
 def extract_topics_from_memory(memory: dict | str) -> list[str]:
@@ -760,8 +972,14 @@ def extract_topics_from_memory(memory: dict | str) -> list[str]:
     else:
         text_content = memory
         
-    hashtags = re.findall(r'#(\w+)', text_content)
-    return list(set(hashtags))[:10]
+    # The first ten distinct hashtags, in order of appearance; the scan stops
+    # at the tenth instead of collecting every tag in the memory
+    topics = {}
+    for match in _HASHTAG_RE.finditer(text_content):
+        topics[match.group(1)] = None
+        if len(topics) == 10:
+            break
+    return list(topics)
 
 
 # ============================================================================
@@ -785,8 +1003,6 @@ def persist_to_nowledge(memory: dict | str, metadata: dict, content: dict) -> bo
     else:
         memory_content_to_send = memory
 
-    url = "http://127.0.0.1:14242/memories"
-    
     # Prepare data for payload
     session_id = metadata.get("session_id", "unknown")
     project = metadata.get("cwd", "unknown")
@@ -813,15 +1029,12 @@ def persist_to_nowledge(memory: dict | str, metadata: dict, content: dict) -> bo
     }
 
     try:
-        import urllib.request
-        import urllib.error
-
-        data = json.dumps(payload).encode('utf-8')
-        req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+        data = json_dumps(payload)
+        req = urllib.request.Request(NOWLEDGE_API_URL, data=data, headers={'Content-Type': 'application/json'})
         
-        logging.debug(f"Sending POST to {url}")
+        logging.debug(f"Sending POST to {NOWLEDGE_API_URL}")
         
-        with urllib.request.urlopen(req, timeout=5) as response:
+        with urllib.request.urlopen(req, timeout=NOWLEDGE_TIMEOUT_SECONDS) as response:
             if 200 <= response.status < 300:
                 logging.info(f"Successfully created memory via REST API. Status: {response.status}")
                 logging.debug("=== persist_to_nowledge() END (success) ===")
@@ -863,8 +1076,8 @@ def main():
         try:
              # Check if stdin has data
              if not sys.stdin.isatty():
-                 stdin_content = sys.stdin.read()
-                 hook_input = json.loads(stdin_content) if stdin_content else {}
+                 stdin_content = sys.stdin.buffer.read()
+                 hook_input = json_loads(stdin_content) if stdin_content else {}
              else:
                  hook_input = {}
         except Exception:
@@ -887,31 +1100,48 @@ def main():
 
         logging.info(f"[context-keeper] Processing session {session_id[:8]}... (trigger: {trigger})")
 
+        # Only compaction discards context worth summarizing; any other event
+        # this script is wired to would throw the parse and LLM call away
+        if hook_event_name != "PreCompact":
+            logging.info(f"[context-keeper] Skipping memory save ({hook_event_name} event)")
+            logging.info("=" * 60 + "\n")
+            sys.exit(0)
+
         # Parse transcript
         if not transcript_path:
             logging.error("No transcript path provided")
             logging.info("=" * 60 + "\n")
             sys.exit(1)
 
-        logging.info("[context-keeper] Parsing transcript...")
-        messages = parse_transcript(transcript_path)
-        if not messages:
+        # An empty or missing transcript has nothing to summarize: skip the
+        # compaction lookup and the parse entirely
+        try:
+            transcript_size = os.path.getsize(os.path.expanduser(transcript_path))
+        except OSError as e:
+            logging.error(f"Transcript file not found: {e}")
+            transcript_size = 0
+        if not transcript_size:
             logging.info("[context-keeper] No messages in transcript, skipping")
             logging.info("=" * 60 + "\n")
             sys.exit(0)
 
-        logging.info(f"[context-keeper] Found {len(messages)} messages")
-
         # Get last compaction time (incremental update)
-        last_compact_time = get_last_compact_time(session_id, cwd, transcript_path)
+        last_compact_time, start_offset = get_last_compaction(session_id, cwd, transcript_path)
         if last_compact_time:
             logging.info(f"[context-keeper] Incremental summary starting from {last_compact_time}")
-        
-        # Extract content
-        logging.debug("[DEBUG] Starting extract_conversation_content...")
-        content = extract_conversation_content(messages, start_cutoff=last_compact_time)
-        logging.debug(f"[DEBUG] Extracted content type: {type(content)}")
-        logging.debug(f"[DEBUG] Extracted content keys: {list(content.keys()) if isinstance(content, dict) else 'Not a dict'}")
+
+        # Stream transcript straight into extraction (single pass), skipping
+        # the lines before the last compaction boundary
+        logging.info("[context-keeper] Parsing transcript...")
+        content = extract_conversation_content(
+            parse_transcript(transcript_path, start_offset), start_cutoff=last_compact_time
+        )
+        if not content["transcript_message_count"]:
+            logging.info("[context-keeper] No messages in transcript, skipping")
+            logging.info("=" * 60 + "\n")
+            sys.exit(0)
+
+        logging.info(f"[context-keeper] Found {content['transcript_message_count']} messages")
 
         # Prepare session info (include all available fields)
         session_info = {
@@ -928,10 +1158,19 @@ def main():
         if custom_instructions:
             logging.info(f"[context-keeper] Custom instructions: {custom_instructions[:50]}{'...' if len(custom_instructions) > 50 else ''}")
 
+        # When nothing the latest memory was built from has changed (e.g. a
+        # compaction re-triggered on the same transcript), it is already saved
+        # and persisted: skip the LLM call, the save and the nowledge upload
+        memory_key = content_hash(content, session_info)
+        if is_memory_current(cwd, session_id, memory_key):
+            logging.info("[context-keeper] Conversation unchanged since the last memory, skipping")
+            logging.info("=" * 60 + "\n")
+            sys.exit(0)
+
         # Generate memory
         logging.info("[context-keeper] Generating memory with AI...")
         memory = generate_memory(content, session_info)
-        
+
         if not memory:
             logging.warning("Failed to generate memory (LLM likely failed). Exiting.")
             sys.exit(0)
@@ -942,26 +1181,24 @@ def main():
             "topics": extract_topics_from_memory(memory),
             "files_modified": content.get("files_modified", []),
             "message_count": content.get("message_count", 0),
-            "tool_call_count": len(content.get("tool_calls", [])),
+            "tool_call_count": content.get("tool_call_count", 0),
             "event_start": content.get("start_time"),
-            "event_end": content.get("end_time")
+            "event_end": content.get("end_time"),
+            "content_hash": memory_key
         }
 
-        # Save to project directory
+        # Save to project directory first: nowledge only receives memories
+        # that were stored locally
         logging.info("[context-keeper] Saving memory...")
         memory_path = save_memory(session_id, memory, metadata, cwd)
-        
+
         logging.info(f"Summary saved: {memory_path}")
         logging.info(f"Files modified: {len(metadata['files_modified'])}")
         logging.info(f"Topics: {', '.join(metadata['topics'][:5]) if metadata['topics'] else 'none extracted'}")
 
         # Persist to nowledge (non-blocking, optional)
-        try:
-            nowledge_success = persist_to_nowledge(memory, metadata, content)
-            if nowledge_success:
-                logging.info("[context-keeper] Persisted to nowledge")
-        except Exception:
-            pass  # Non-blocking
+        if persist_to_nowledge(memory, metadata, content):
+            logging.info("[context-keeper] Persisted to nowledge")
 
         # Print visible completion message
         logging.info("[context-keeper] Session context saved successfully!")
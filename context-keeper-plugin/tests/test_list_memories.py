@@ -0,0 +1,35 @@
+import json
+
+import list_memories
+import list_memory_sessions
+
+
+def write_legacy_index(project):
+    memories_dir = project / ".claude" / "memories"
+    memories_dir.mkdir(parents=True)
+    legacy = {"memories": [
+        {"session_id": "bbbbbbbb-2", "created_at": "2026-01-02T00:00:00", "message_count": 2},
+        {"session_id": "aaaaaaaa-1", "created_at": "2026-01-01T00:00:00", "message_count": 1},
+    ]}
+    (memories_dir / "index.json").write_text(json.dumps(legacy))
+
+
+def test_list_memories_reads_legacy_index(tmp_path, monkeypatch, capsys):
+    write_legacy_index(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("sys.argv", ["list_memories.py"])
+
+    list_memories.main()
+
+    out = capsys.readouterr().out
+    assert out.index("bbbbbbbb...") < out.index("aaaaaaaa...")
+    assert "Total: 2 context memories across 2 sessions" in out
+
+
+def test_list_memory_sessions_reads_legacy_index(tmp_path, monkeypatch, capsys):
+    write_legacy_index(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    list_memory_sessions.main()
+
+    assert "**Total:** 2 sessions with 2 context memories" in capsys.readouterr().out
@@ -0,0 +1,60 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from load_memory import INDEX_READ_BLOCK, iter_index_entries, iter_lines_reversed, memory_age_hours
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"only",
+    b"a\nbb\nccc",
+    b"a\nbb\nccc\n",
+    b"\n\na\n\n",
+])
+def test_iter_lines_reversed_small(tmp_path, data):
+    path = tmp_path / "f"
+    path.write_bytes(data)
+    assert list(iter_lines_reversed(path)) == data.split(b"\n")[::-1]
+
+
+@pytest.mark.parametrize("trailing", [b"", b"\n"])
+def test_iter_lines_reversed_across_blocks(tmp_path, trailing):
+    # Line lengths chosen so that lines straddle INDEX_READ_BLOCK boundaries
+    lines = [bytes([65 + i % 26]) * (INDEX_READ_BLOCK // 3 + i * 7) for i in range(10)]
+    lines.append(b"x" * (INDEX_READ_BLOCK * 2 + 5))
+    data = b"\n".join(lines) + trailing
+    path = tmp_path / "f"
+    path.write_bytes(data)
+    assert list(iter_lines_reversed(path)) == data.split(b"\n")[::-1]
+
+
+def test_iter_index_entries_newest_first(tmp_path):
+    path = tmp_path / "index.jsonl"
+    path.write_bytes(b'{"n": 1}\n\nnot json\n{"n": 2}\n{"n": 3}\n')
+    assert [entry["n"] for entry in iter_index_entries(path)] == [3, 2, 1]
+
+
+def test_iter_index_entries_migrates_legacy_index(tmp_path):
+    legacy = {"memories": [{"n": 2}, {"n": 1}], "last_session": None}
+    (tmp_path / "index.json").write_text(json.dumps(legacy))
+    path = tmp_path / "index.jsonl"
+
+    assert [entry["n"] for entry in iter_index_entries(path)] == [2, 1]
+    assert [json.loads(line)["n"] for line in path.read_bytes().splitlines()] == [1, 2]
+
+
+def test_memory_age_hours_aware_timestamp():
+    created = datetime.now(timezone.utc) - timedelta(hours=30)
+    assert memory_age_hours({"timestamp": created.isoformat()}) == pytest.approx(30, abs=0.01)
+
+
+def test_memory_age_hours_directory_timestamp():
+    created = datetime.now() - timedelta(hours=2)
+    assert memory_age_hours({"timestamp": created.strftime("%Y%m%d_%H%M%S")}) == pytest.approx(2, abs=0.01)
+
+
+@pytest.mark.parametrize("metadata", [{"timestamp": "not a time"}, {"timestamp": None}, {}])
+def test_memory_age_hours_unparsable(metadata):
+    assert memory_age_hours(metadata) is None
@@ -0,0 +1,171 @@
+import io
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import save_memory
+from save_memory import INDEX_FILENAME, MAX_INDEX_ENTRIES, iter_lines_reversed, update_index
+
+
+def expected_reversed(data: bytes) -> list[tuple[int, bytes]]:
+    pairs = []
+    offset = 0
+    for line in data.split(b"\n"):
+        pairs.append((offset, line))
+        offset += len(line) + 1
+    return pairs[::-1]
+
+
+@pytest.mark.parametrize("data", [b"", b"only", b"a\nbb\nccc", b"a\nbb\nccc\n", b"\n\na\n\n"])
+@pytest.mark.parametrize("block", [1, 3, 1024 * 1024])
+def test_iter_lines_reversed_offsets(tmp_path, monkeypatch, data, block):
+    monkeypatch.setattr(save_memory, "TRANSCRIPT_TAIL_BLOCK", block)
+    path = tmp_path / "transcript.jsonl"
+    path.write_bytes(data)
+    pairs = list(iter_lines_reversed(str(path)))
+    assert pairs == expected_reversed(data)
+    for offset, line in pairs:
+        assert data[offset:offset + len(line)] == line
+
+
+def test_update_index_trims_to_newest_entries(tmp_path):
+    metadata = {"timestamp": "2026-01-01T00:00:00+00:00", "trigger": "auto", "cwd": "/project", "message_count": 3}
+    for i in range(501):
+        update_index(tmp_path, f"00000000-0000-0000-0000-{i:012d}", "20260101_000000", metadata)
+
+    lines = (tmp_path / INDEX_FILENAME).read_bytes().splitlines()
+    assert len(lines) == MAX_INDEX_ENTRIES
+    session_ids = [json.loads(line)["session_id"] for line in lines]
+    assert session_ids[0] == f"00000000-0000-0000-0000-{501 - MAX_INDEX_ENTRIES:012d}"
+    assert session_ids[-1] == f"00000000-0000-0000-0000-{500:012d}"
+
+
+def test_update_index_appends_below_threshold(tmp_path):
+    for i in range(3):
+        update_index(tmp_path, f"session-{i}", "20260101_000000", {})
+
+    lines = (tmp_path / INDEX_FILENAME).read_bytes().splitlines()
+    assert [json.loads(line)["session_id"] for line in lines] == ["session-0", "session-1", "session-2"]
+
+
+@pytest.mark.parametrize("trailing", [b"", b"\n"])
+def test_parse_transcript_streams_from_offset(tmp_path, trailing):
+    head = b'{"n": 1}\n'
+    path = tmp_path / "transcript.jsonl"
+    path.write_bytes(head + b'{"n": 2}\n\nnot json\n{"n": 3}' + trailing)
+    assert [msg["n"] for msg in save_memory.parse_transcript(str(path))] == [1, 2, 3]
+    assert [msg["n"] for msg in save_memory.parse_transcript(str(path), len(head))] == [2, 3]
+
+
+def test_update_index_migrates_legacy_index(tmp_path):
+    legacy = {"memories": [{"session_id": "old-2"}, {"session_id": "old-1"}], "last_session": "old-2"}
+    (tmp_path / "index.json").write_text(json.dumps(legacy))
+
+    update_index(tmp_path, "new", "20260101_000000", {})
+
+    lines = (tmp_path / INDEX_FILENAME).read_bytes().splitlines()
+    assert [json.loads(line)["session_id"] for line in lines] == ["old-1", "old-2", "new"]
+
+
+TRANSCRIPT = b"\n".join([
+    b'{"type":"system","subtype":"compact_boundary","timestamp":"2026-01-01T00:00:00Z"}',
+    b'{"type":"user","timestamp":"2026-01-01T00:01:00Z","message":{"role":"user","content":"Fix the login bug"}}',
+    b'{"type":"assistant","timestamp":"2026-01-01T00:02:00Z","message":{"role":"assistant","content":"Fixed #auth"}}',
+]) + b"\n"
+
+
+@pytest.fixture
+def hook(tmp_path, monkeypatch):
+    """Run main() as the PreCompact hook; returns (run, generated) where generated records LLM calls."""
+    transcript = tmp_path / "transcript.jsonl"
+    transcript.write_bytes(TRANSCRIPT)
+    project = tmp_path / "project"
+    project.mkdir()
+    model = ["model-a"]
+    generated = []
+
+    def generate_memory(content, session_info):
+        generated.append(session_info.get("custom_instructions"))
+        return {"nowledge_summary": "summary", "full_memory": "memory #auth"}
+
+    monkeypatch.setattr(save_memory, "get_summary_config", lambda: ("key", None, model[0]))
+    monkeypatch.setattr(save_memory, "generate_memory", generate_memory)
+    monkeypatch.setattr(save_memory, "persist_to_nowledge", lambda *args: False)
+    monkeypatch.setattr("sys.argv", ["save_memory.py"])
+
+    def run(custom_instructions="", model_name="model-a"):
+        model[0] = model_name
+        hook_input = {
+            "session_id": "session-1",
+            "transcript_path": str(transcript),
+            "cwd": str(project),
+            "hook_event_name": "PreCompact",
+            "custom_instructions": custom_instructions,
+        }
+        stdin = SimpleNamespace(isatty=lambda: False, buffer=io.BytesIO(json.dumps(hook_input).encode()))
+        monkeypatch.setattr("sys.stdin", stdin)
+        with pytest.raises(SystemExit) as exit_info:
+            save_memory.main()
+        assert exit_info.value.code == 0
+
+    return run, generated
+
+
+def test_unchanged_conversation_skips_generation(hook, tmp_path):
+    run, generated = hook
+    run()
+    run()
+    assert len(generated) == 1
+    index_path = tmp_path / "project" / ".claude" / "memories" / INDEX_FILENAME
+    assert len(index_path.read_bytes().splitlines()) == 1
+
+
+@pytest.mark.parametrize("change", [{"custom_instructions": "focus on tests"}, {"model_name": "model-b"}])
+def test_changed_inputs_regenerate(hook, change):
+    run, generated = hook
+    run()
+    run(**change)
+    assert len(generated) == 2
+
+
+def test_memory_without_metadata_is_not_current(tmp_path):
+    latest = tmp_path / ".claude" / "memories" / "session-1" / "latest"
+    latest.mkdir(parents=True)
+    (latest / "memory.json").write_text(json.dumps({"content": "old memory"}))
+    assert not save_memory.is_memory_current(str(tmp_path), "session-1", "any-key")
+
+
+def test_append_during_trim_is_kept(tmp_path, monkeypatch):
+    metadata = {"timestamp": "2026-01-01T00:00:00+00:00", "trigger": "auto", "cwd": "/project", "message_count": 3}
+    for i in range(save_memory.INDEX_TRIM_THRESHOLD):
+        update_index(tmp_path, f"00000000-0000-0000-0000-{i:012d}", "20260101_000000", metadata)
+
+    # Another hook appends while the trim is between reading and replacing the index
+    other = threading.Thread(target=update_index, args=(tmp_path, "concurrent", "20260101_000000", metadata))
+    write_bytes_atomic = save_memory.write_bytes_atomic
+
+    def write_during_append(path, data):
+        other.start()
+        other.join(timeout=0.2)
+        write_bytes_atomic(path, data)
+
+    monkeypatch.setattr(save_memory, "write_bytes_atomic", write_during_append)
+    update_index(tmp_path, "trigger", "20260101_000000", metadata)
+    monkeypatch.setattr(save_memory, "write_bytes_atomic", write_bytes_atomic)
+    other.join()
+
+    lines = (tmp_path / INDEX_FILENAME).read_bytes().splitlines()
+    assert [json.loads(line)["session_id"] for line in lines[-2:]] == ["trigger", "concurrent"]
+    assert len(lines) == MAX_INDEX_ENTRIES + 1
+
+
+def test_write_bytes_atomic_cleans_up_on_failure(tmp_path, monkeypatch):
+    def fail_replace(src, dst):
+        raise OSError("replace failed")
+
+    monkeypatch.setattr(save_memory.os, "replace", fail_replace)
+    with pytest.raises(OSError):
+        save_memory.write_bytes_atomic(tmp_path / "memory.json", b"{}")
+    assert list(tmp_path.iterdir()) == []